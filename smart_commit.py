@@ -8,14 +8,33 @@ Automatically generates informative commit messages using Google's Gemini AI
 import subprocess
 import sys
 import os
-import json
-import argparse
-from typing import List, Optional, Dict
-import requests
-from datetime import datetime
+import shutil
+from typing import TYPE_CHECKING, List, Optional, Dict
+
+# Heavier modules (requests, pygit2, orjson, ...) are imported where they are used, so paths
+# that never need them, like committing with -m, start quickly
+if TYPE_CHECKING:
+    import pygit2
+    import requests
+
+# Upper bound on how much of a diff is read; the prompt only ever uses the head of it
+MAX_DIFF_BYTES = 8192
+
+# Characters of context sent to Gemini before raw diff lines are dropped from the prompt
+PROMPT_CONTEXT_BUDGET = 4000
+
+# Porcelain status letter -> position in the (added, modified, deleted, renamed) buckets.
+# Copies add a new file and type changes (e.g. file <-> symlink) modify an existing one
+STATUS_DISPATCH = {b'A': 0, b'C': 0, b'M': 1, b'T': 1, b'D': 2, b'R': 3}
+
+# Past these sizes spawning git beats pygit2: libgit2 scans large trees and renders large
+# patches more slowly than git does, so only small repositories and changes are read in-process.
+# The index is sized on disk because loading it is already a large part of the cost
+IN_PROCESS_MAX_INDEX_BYTES = 400 * 1024
+IN_PROCESS_MAX_DIFF_BYTES = 64 * 1024
 
 class SmartCommit:
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, use_cache: bool = True):
         """Initialize the SmartCommit tool"""
         self.api_key = api_key or os.getenv('GEMINI_API_KEY')
         if not self.api_key:
@@ -23,40 +42,177 @@ class SmartCommit:
 
         self.gemini_url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent"
 
+        # subprocess only takes its faster posix_spawn path for an absolute executable, no cwd
+        # argument and close_fds=False. Python's own file descriptors are non-inheritable
+        # (PEP 446), so skipping close_fds is safe; programs are resolved once and cached here
+        self._close_fds = os.name != 'posix'
+        self._programs: Dict[str, str] = {}
+
+        # One HTTP client per instance so repeated API calls reuse the TLS connection.
+        # Created on first use: requests is slow to import and most runs never hit the network
+        self._session: Optional['requests.Session'] = None
+
+        # pygit2 repository, opened on first use through the repo property
+        self._repo: Optional['pygit2.Repository'] = None
+        self._repo_opened = False
+
+        # Generated messages are cached on disk, keyed by a hash of the prompt
+        self.use_cache = use_cache
+        cache_home = os.getenv('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+        self.cache_dir = os.path.join(cache_home, 'smart-commit', 'responses')
+
+    @property
+    def repo(self) -> Optional['pygit2.Repository']:
+        """The pygit2 repository, or None when pygit2 is not installed or there is no repository"""
+        if not self._repo_opened:
+            self._repo = self._open_repository()
+            self._repo_opened = True
+        return self._repo
+
+    def _open_repository(self) -> Optional['pygit2.Repository']:
+        """Open the repository in-process with pygit2 when it is installed"""
+        try:
+            import pygit2
+        except ImportError:
+            return None
+        try:
+            path = pygit2.discover_repository(os.getcwd())
+            if path is None:
+                return None
+            repo = pygit2.Repository(path)
+        except pygit2.GitError:
+            return None
+        # Bare repositories have no working tree to inspect, leave them to the git CLI
+        return None if repo.is_bare else repo
+
+    def _spawn_command(self, command: List[str]) -> List[str]:
+        """Replace the program name with its absolute path, looked up once per program"""
+        program = self._programs.get(command[0])
+        if program is None:
+            program = self._programs[command[0]] = shutil.which(command[0]) or command[0]
+        return [program, *command[1:]]
+
     def run_git_command(self, command: List[str]) -> tuple[str, str, int]:
         """Run a git command and return stdout, stderr, and return code"""
         try:
             result = subprocess.run(
-                command,
+                self._spawn_command(command),
                 capture_output=True,
                 text=True,
-                cwd=os.getcwd()
+                errors='replace',
+                close_fds=self._close_fds
             )
             return result.stdout, result.stderr, result.returncode
         except Exception as e:
             return "", str(e), 1
 
+    def run_git_command_binary(self, command: List[str]) -> tuple[bytes, bytes, int]:
+        """Run a git command and return undecoded stdout, stderr, and return code"""
+        try:
+            result = subprocess.run(
+                self._spawn_command(command),
+                capture_output=True,
+                close_fds=self._close_fds
+            )
+            return result.stdout, result.stderr, result.returncode
+        except Exception as e:
+            return b"", str(e).encode(), 1
+
     def check_git_repo(self) -> bool:
         """Check if current directory is a git repository"""
+        # Don't open the repository just for this, the -m path never needs pygit2
+        if self._repo is not None:
+            return True
         stdout, stderr, code = self.run_git_command(['git', 'rev-parse', '--git-dir'])
         return code == 0
 
-    def get_git_status(self) -> str:
-        """Get git status information"""
-        stdout, stderr, code = self.run_git_command(['git', 'status', '--porcelain'])
+    def _status_command(self, include_untracked: bool = False) -> List[str]:
+        """Build the git status command; skipping untracked files avoids walking untracked directories"""
+        cmd = ['git', 'status', '-z', '--porcelain']
+        if not include_untracked:
+            cmd.append('--untracked-files=no')
+        return cmd
+
+    def get_git_status(self, include_untracked: bool = False) -> bytes:
+        """Get git status information
+
+        Untracked files are left out unless asked for; newly added files are still
+        reported because they are in the index.
+        """
+        stdout, stderr, code = self.run_git_command_binary(self._status_command(include_untracked))
         if code != 0:
-            raise Exception(f"Failed to get git status: {stderr}")
+            raise Exception(f"Failed to get git status: {stderr.decode(errors='replace')}")
         return stdout
 
-    def get_git_diff(self, staged: bool = True) -> str:
-        """Get git diff (staged or unstaged changes)"""
-        cmd = ['git', 'diff']
+    def _in_process_repo(self, needs_head: bool = False):
+        """Get the pygit2 repository if it can stand in for the git CLI right now, else None"""
+        repo = self.repo
+        if repo is None:
+            return None
+
+        import pygit2
+        if needs_head and repo.head_is_unborn:
+            return None
+        # Mid-merge the index holds conflict stages that libgit2 doesn't render the way git
+        # does, so leave conflicts to the CLI
+        try:
+            repo.index.read(False)
+            if repo.index.conflicts is not None:
+                return None
+        except pygit2.GitError:
+            return None
+        return repo
+
+    def _format_status(self, index_entries: Dict[str, tuple[str, str]], worktree: Dict[str, str]) -> bytes:
+        """Build `git status -z --porcelain --untracked-files=no` style output from pygit2 deltas"""
+        lines = []
+        for path in sorted(index_entries.keys() | worktree.keys()):
+            x, source = index_entries.get(path, (' ', path))
+            lines.append(f"{x}{worktree.get(path, ' ')} {path}\0")
+            if x in 'RC':
+                # Like git, renames and copies are followed by their source path
+                lines.append(f"{source}\0")
+        return ''.join(lines).encode('utf-8', errors='surrogateescape')
+
+    def _diff_command(self, staged: bool) -> List[str]:
+        """Build the git diff command, trimmed to as few lines per hunk as possible"""
+        cmd = ['git', 'diff', '--no-color', '--no-ext-diff', '-U1']
         if staged:
             cmd.append('--staged')
+        return cmd
 
-        stdout, stderr, code = self.run_git_command(cmd)
+    def get_git_diff(self, staged: bool = True, max_bytes: int = MAX_DIFF_BYTES) -> bytes:
+        """Get git diff (staged or unstaged changes), truncated to max_bytes
+
+        The diff is returned undecoded; only the part that ends up in the prompt gets decoded.
+        """
+        try:
+            proc = subprocess.Popen(
+                self._spawn_command(self._diff_command(staged)),
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                close_fds=self._close_fds
+            )
+        except OSError as e:
+            print(f"Warning: Failed to get diff: {e}")
+            return b""
+
+        with proc:
+            # Read only what we need and stop git instead of draining the whole diff
+            output = proc.stdout.read(max_bytes)
+            proc.stdout.close()
+            proc.kill()
+            _, stderr = proc.communicate()
+
+        if proc.returncode > 0:
+            print(f"Warning: Failed to get diff: {stderr.decode(errors='replace')}")
+            return b""
+        return output
+
+    def get_diff_stat(self) -> str:
+        """Get per-file line counts of the staged changes"""
+        stdout, stderr, code = self.run_git_command(['git', 'diff', '--staged', '--stat=200'])
         if code != 0:
-            print(f"Warning: Failed to get diff: {stderr}")
             return ""
         return stdout
 
@@ -69,50 +225,222 @@ class SmartCommit:
             return ""
         return stdout
 
-    def analyze_changes(self) -> Dict[str, any]:
-        """Analyze the current changes in the repository"""
-        status = self.get_git_status()
-        staged_diff = self.get_git_diff(staged=True)
-        unstaged_diff = self.get_git_diff(staged=False)
-        recent_commits = self.get_recent_commits()
-
-        # Parse status to categorize changes
-        added_files = []
-        modified_files = []
-        deleted_files = []
-        renamed_files = []
-
-        for line in status.split('\n'):
-            if not line.strip():
+    def _collect_repo_state(self, sections: tuple[str, ...]) -> Optional[Dict[str, any]]:
+        """Read the requested sections in-process with pygit2, or None if git should do it
+
+        One HEAD-to-index diff yields the status index column, the staged patch and the stat.
+        """
+        if self.repo is None:
+            return None
+        try:
+            if os.path.getsize(os.path.join(self.repo.path, 'index')) > IN_PROCESS_MAX_INDEX_BYTES:
+                return None
+        except OSError:
+            pass
+        repo = self._in_process_repo(needs_head=True)
+        if repo is None:
+            return None
+
+        import pygit2
+
+        try:
+            # Positional on purpose: Repository.diff hands context_lines to diff_to_index as a
+            # keyword, which it ignores, and the patch comes out with git's default 3 lines
+            diff = repo.revparse_single('HEAD').peel(pygit2.Tree).diff_to_index(repo.index, 0, 1)
+            # The index knows the size of added and modified files, deleted ones are looked up
+            staged_bytes = 0
+            for delta in diff.deltas:
+                if delta.status == pygit2.GIT_DELTA_DELETED:
+                    staged_bytes += repo[delta.old_file.id].size
+                else:
+                    staged_bytes += delta.new_file.size
+                if staged_bytes > IN_PROCESS_MAX_DIFF_BYTES:
+                    return None
+            diff.find_similar()
+
+            state = {}
+            if 'status' in sections:
+                index_entries = {
+                    delta.new_file.path: (delta.status_char(), delta.old_file.path)
+                    for delta in diff.deltas
+                }
+                # Untracked files are left out of an index-to-worktree diff, as with --untracked-files=no
+                worktree = {
+                    delta.new_file.path: delta.status_char()
+                    for delta in repo.index.diff_to_workdir().deltas
+                }
+                state['status'] = self._format_status(index_entries, worktree)
+
+            if 'staged_diff' in sections:
+                # Patches are generated lazily, stop as soon as we have enough
+                chunks = []
+                size = 0
+                for patch in diff:
+                    chunks.append(patch.data)
+                    size += len(patch.data)
+                    if size >= MAX_DIFF_BYTES:
+                        break
+                state['staged_diff'] = b''.join(chunks)[:MAX_DIFF_BYTES]
+
+            if 'staged_stat' in sections:
+                stats = diff.stats
+                # git prints nothing for an empty diff, libgit2 a "0 files changed" line
+                state['staged_stat'] = (
+                    stats.format(pygit2.GIT_DIFF_STATS_FULL, 200) if stats.files_changed else ""
+                )
+
+            if 'recent_commits' in sections:
+                lines = []
+                walker = repo.walk(repo.head.target, pygit2.GIT_SORT_TOPOLOGICAL | pygit2.GIT_SORT_TIME)
+                for commit in walker:
+                    if len(commit.parent_ids) > 1:
+                        continue
+                    subject = commit.message.partition('\n')[0]
+                    lines.append(f"{commit.short_id} {subject}\n")
+                    if len(lines) == 5:
+                        break
+                state['recent_commits'] = ''.join(lines)
+        except pygit2.GitError:
+            return None
+        return state
+
+    def _collect_git_state(self, sections: tuple[str, ...]) -> Dict[str, any]:
+        """Run the requested git queries in a single git round trip and return their output by name
+
+        Status and diffs stay as bytes, the stat and log sections are decoded.
+        """
+        # Small repositories are quicker to read with pygit2 than to spawn git for
+        state = self._collect_repo_state(sections)
+        if state is not None:
+            return state
+
+        if os.name == 'nt' or not shutil.which('sh'):
+            from concurrent.futures import ThreadPoolExecutor
+
+            readers = {
+                'status': self.get_git_status,
+                'staged_diff': lambda: self.get_git_diff(staged=True),
+                'staged_stat': self.get_diff_stat,
+                'recent_commits': self.get_recent_commits,
+            }
+            # Without a POSIX shell there is nothing to batch through. The commands are independent
+            # and spend their time waiting on git, so run them concurrently instead
+            with ThreadPoolExecutor(max_workers=len(sections)) as executor:
+                futures = {name: executor.submit(readers[name]) for name in sections}
+                return {name: future.result() for name, future in futures.items()}
+
+        import shlex
+        import uuid
+
+        commands = {
+            'status': f"{shlex.join(self._status_command())} || exit $?",
+            'staged_diff': f"{shlex.join(self._diff_command(staged=True))} | head -c {MAX_DIFF_BYTES}",
+            'staged_stat': shlex.join(['git', 'diff', '--staged', '--stat=200']),
+            'recent_commits': shlex.join(['git', 'log', '-5', '--oneline', '--no-merges']),
+        }
+
+        # A random sentinel line separates the sections so diff content can't collide with it
+        sentinel = f"smart-commit-{uuid.uuid4().hex}"
+        script = f"; echo {sentinel}; ".join(commands[name] for name in sections) + "; exit 0"
+
+        # Plain sh, not bash: a non-interactive `bash -c` sources $BASH_ENV, and anything that
+        # prints would land in front of the status section. The script is POSIX only
+        stdout, stderr, code = self.run_git_command_binary(['sh', '-c', script])
+        if code != 0:
+            raise Exception(f"Failed to get git status: {stderr.decode(errors='replace')}")
+
+        output = stdout.split(f"{sentinel}\n".encode())
+        if len(output) != len(sections):
+            raise Exception("Unexpected git output while collecting repository state")
+
+        state = dict(zip(sections, output))
+        for name in ('staged_stat', 'recent_commits'):
+            if name in state:
+                state[name] = state[name].decode('utf-8', errors='replace')
+        return state
+
+    def analyze_changes(self, previous: Optional[Dict[str, any]] = None) -> Dict[str, any]:
+        """Analyze the current changes in the repository
+
+        Pass the previous analysis after staging to reload only what staging can change.
+        """
+        if previous is None:
+            state = self._collect_git_state(('status', 'staged_diff', 'staged_stat', 'recent_commits'))
+        else:
+            # Staging only touches the index, history is unchanged and can be reused
+            state = self._collect_git_state(('status', 'staged_diff', 'staged_stat'))
+            state['recent_commits'] = previous['recent_commits']
+
+        changes = self._classify_status(state['status'])
+        changes.update(
+            staged_diff=state['staged_diff'],
+            staged_stat=state['staged_stat'],
+            recent_commits=state['recent_commits'],
+        )
+        return changes
+
+    def _classify_status(self, status: bytes) -> Dict[str, any]:
+        """Sort the files in `git status -z --porcelain` output into added/modified/deleted/renamed"""
+        # Parse status to categorize changes. X is the index (staged) column and Y the
+        # worktree column, so a file can be e.g. added in the index and modified on disk
+        staged = ([], [], [], [])
+        unstaged = ([], [], [], [])
+        # Any worktree change means `git diff` would be non-empty, without having to generate it
+        has_unstaged_changes = False
+
+        # Entries are NUL-terminated "XY path" records; paths are not quoted
+        entries = iter(status.split(b'\0'))
+        for entry in entries:
+            if not entry:
+                continue
+
+            x, y = entry[0:1], entry[1:2]
+            if x in b'RC' or y in b'RC':
+                # Renames and copies carry their source path as a separate entry
+                next(entries, None)
+
+            # Unmerged paths (DD, AU, UD, UA, DU, AA, UU) describe a conflict, not an addition or
+            # deletion, and have to be resolved before anything can be committed
+            if x == b'U' or y == b'U' or (x == y and (x == b'A' or x == b'D')):
                 continue
 
-            status_code = line[:2]
-            filename = line[3:]
+            filename = entry[3:].decode('utf-8', errors='replace')
+            idx = STATUS_DISPATCH.get(x)
+            if idx is not None:
+                staged[idx].append(filename)
+            idx = STATUS_DISPATCH.get(y)
+            if idx is not None:
+                unstaged[idx].append(filename)
+            if y != b' ' and y != b'?':
+                has_unstaged_changes = True
 
-            if 'A' in status_code:
-                added_files.append(filename)
-            elif 'M' in status_code:
-                modified_files.append(filename)
-            elif 'D' in status_code:
-                deleted_files.append(filename)
-            elif 'R' in status_code:
-                renamed_files.append(filename)
+        # Describe what the commit will contain: the index when anything is staged,
+        # otherwise the worktree changes that staging would pick up
+        added_files, modified_files, deleted_files, renamed_files = staged if any(staged) else unstaged
 
         return {
             'added_files': added_files,
             'modified_files': modified_files,
             'deleted_files': deleted_files,
             'renamed_files': renamed_files,
-            'staged_diff': staged_diff,
-            'unstaged_diff': unstaged_diff,
-            'recent_commits': recent_commits,
+            'has_unstaged_changes': has_unstaged_changes,
             'total_changes': len(added_files) + len(modified_files) + len(deleted_files) + len(renamed_files)
         }
 
     def generate_commit_message(self, changes: Dict[str, any]) -> str:
         """Generate commit message using Gemini AI"""
+        message, warning = self._generate_commit_message(changes)
+        if warning:
+            print(warning)
+        return message
+
+    def _generate_commit_message(self, changes: Dict[str, any]) -> tuple[str, Optional[str]]:
+        """Generate the commit message without printing, returning it with a warning to show (if any)
+
+        Safe to run off the main thread, the caller decides when the warning gets printed.
+        """
         if not self.api_key:
-            return self.generate_fallback_message(changes)
+            return self.generate_fallback_message(changes), None
 
         # Prepare context for Gemini
         context = self.prepare_context_for_ai(changes)
@@ -133,14 +461,50 @@ Context:
 Generate only the commit message, nothing else. Make it informative and professional.
 """
 
+        import hashlib
+
+        cache_key = hashlib.sha256(f"{self.gemini_url}\n{prompt}".encode('utf-8')).hexdigest()
+        if self.use_cache:
+            cached_message = self._read_cached_message(cache_key)
+            if cached_message:
+                return cached_message, None
+
         try:
             response = self.call_gemini_api(prompt)
             if response:
-                return response.strip()
+                message = response.strip()
+                if self.use_cache:
+                    self._write_cached_message(cache_key, message)
+                return message, None
         except Exception as e:
-            print(f"⚠️  Failed to generate AI commit message: {e}")
+            return self.generate_fallback_message(changes), f"⚠️  Failed to generate AI commit message: {e}"
+
+        return self.generate_fallback_message(changes), None
+
+    def _read_cached_message(self, key: str) -> Optional[str]:
+        """Return a previously generated commit message for this prompt, if any"""
+        import json
+
+        try:
+            with open(os.path.join(self.cache_dir, f"{key}.json"), encoding='utf-8') as f:
+                return json.load(f).get('message')
+        except (OSError, ValueError, AttributeError):
+            return None
 
-        return self.generate_fallback_message(changes)
+    def _write_cached_message(self, key: str, message: str) -> None:
+        """Store a generated commit message; caching is best effort and never fails the commit"""
+        import json
+        import tempfile
+
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Write to a temporary file first so concurrent runs never read a partial entry
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'message': message}, f)
+            os.replace(tmp_path, os.path.join(self.cache_dir, f"{key}.json"))
+        except OSError:
+            pass
 
     def prepare_context_for_ai(self, changes: Dict[str, any]) -> str:
         """Prepare a context string for the AI"""
@@ -160,15 +524,45 @@ Generate only the commit message, nothing else. Make it informative and professi
         if changes['recent_commits']:
             context_parts.append(f"Recent commits:\n{changes['recent_commits']}")
 
-        # Diff summary (truncated to avoid token limits)
-        if changes['staged_diff']:
-            diff_lines = changes['staged_diff'].split('\n')[:50]  # Limit to 50 lines
-            context_parts.append(f"Code changes:\n" + '\n'.join(diff_lines))
+        # Per-file line counts describe the change compactly and deterministically
+        if changes['staged_stat']:
+            context_parts.append(f"Change summary:\n{changes['staged_stat']}")
+
+        # Raw diff lines only while the prompt budget allows (truncated to avoid token limits)
+        budget = PROMPT_CONTEXT_BUDGET - sum(len(part) for part in context_parts)
+        if changes['staged_diff'] and budget > 0:
+            # Limit to 50 lines; maxsplit stops splitting once they are found
+            diff_lines = changes['staged_diff'].split(b'\n', 50)[:50]
+            diff_text = b'\n'.join(diff_lines).decode('utf-8', errors='replace')
+            context_parts.append(f"Code changes:\n{diff_text}"[:budget])
 
         return '\n\n'.join(context_parts)
 
+    def _get_session(self) -> 'requests.Session':
+        """Get the shared HTTP session, creating it on first use"""
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+
+            self._session = requests.Session()
+            self._session.mount('https://', HTTPAdapter(
+                pool_connections=4,
+                pool_maxsize=4,
+                max_retries=Retry(total=2, backoff_factor=0.2)
+            ))
+        return self._session
+
     def call_gemini_api(self, prompt: str) -> Optional[str]:
         """Call Gemini AI API"""
+        import json
+        import requests
+
+        try:
+            import orjson
+        except ImportError:
+            orjson = None
+
         headers = {
             'Content-Type': 'application/json',
         }
@@ -189,11 +583,17 @@ Generate only the commit message, nothing else. Make it informative and professi
 
         url = f"{self.gemini_url}?key={self.api_key}"
 
+        # orjson serializes straight to UTF-8 bytes; fall back to the stdlib when it isn't installed
+        if orjson is not None:
+            body = orjson.dumps(data)
+        else:
+            body = json.dumps(data).encode('utf-8')
+
         try:
-            response = requests.post(url, headers=headers, json=data, timeout=30)
+            response = self._get_session().post(url, headers=headers, data=body, timeout=30)
             response.raise_for_status()
 
-            result = response.json()
+            result = orjson.loads(response.content) if orjson is not None else response.json()
 
             # Debug: Print the response structure for troubleshooting
             # print(f"DEBUG: API Response: {json.dumps(result, indent=2)}")
@@ -306,6 +706,21 @@ Generate only the commit message, nothing else. Make it informative and professi
             print("ℹ️  No changes detected. Nothing to commit.")
             return True
 
+        # With changes already staged there is nothing left to ask before generating the message,
+        # so start the API call now and let it overlap with printing the summary. The thread is a
+        # daemon so Ctrl-C exits right away instead of waiting on the request, and it never
+        # prints: its result and warning are picked up on the main thread
+        generator = None
+        pending_message = {}
+        if changes['staged_diff']:
+            import threading
+
+            def generate():
+                pending_message['result'] = self._generate_commit_message(changes)
+
+            generator = threading.Thread(target=generate, daemon=True)
+            generator.start()
+
         # Show summary
         print(f"\n📊 Changes Summary:")
         if changes['added_files']:
@@ -318,20 +733,27 @@ Generate only the commit message, nothing else. Make it informative and professi
             print(f"  🔄 Renamed: {len(changes['renamed_files'])} files")
 
         # Check if we have staged changes
-        if not changes['staged_diff'] and changes['unstaged_diff']:
+        if not changes['staged_diff'] and changes['has_unstaged_changes']:
             stage = input("\n❓ Stage all changes? (y/N): ").lower().strip()
             if stage == 'y':
                 if not self.stage_all_changes():
                     return False
                 # Re-analyze after staging
-                changes = self.analyze_changes()
+                changes = self.analyze_changes(previous=changes)
 
         if not changes['staged_diff']:
             print("ℹ️  No staged changes to commit.")
             return True
 
         print("\n🤖 Generating commit message...")
-        suggested_message = self.generate_commit_message(changes)
+        if generator is not None:
+            generator.join()
+        if 'result' in pending_message:
+            suggested_message, warning = pending_message['result']
+            if warning:
+                print(warning)
+        else:
+            suggested_message = self.generate_commit_message(changes)
 
         print(f"\n💡 Suggested commit message:")
         print(f"   {suggested_message}")
@@ -367,16 +789,19 @@ Generate only the commit message, nothing else. Make it informative and professi
         return True
 
 def main():
+    import argparse
+
     parser = argparse.ArgumentParser(description='Smart Git Commit Tool with AI')
     parser.add_argument('--api-key', help='Gemini API key (or set GEMINI_API_KEY env var)')
     parser.add_argument('--message', '-m', help='Custom commit message (skips AI generation)')
     parser.add_argument('--auto-stage', '-a', action='store_true', help='Automatically stage all changes')
     parser.add_argument('--push', '-p', action='store_true', help='Push after committing')
     parser.add_argument('--dry-run', action='store_true', help='Show what would be done without doing it')
+    parser.add_argument('--no-cache', action='store_true', help='Always ask Gemini instead of reusing a cached message')
 
     args = parser.parse_args()
 
-    smart_commit = SmartCommit(api_key=args.api_key)
+    smart_commit = SmartCommit(api_key=args.api_key, use_cache=not args.no_cache)
 
     if args.dry_run:
         print("🔍 Dry run mode - analyzing changes...")